@@ -1,22 +1,146 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import dataclass, replace
+import asyncio
+import bisect
+import functools
+import gc
 import math
 import httpx
-from typing import Dict, Any, List, Optional
+import ijson
+import numpy as np
+import orjson
+from cachetools import TTLCache
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Literal, Optional, Tuple
 import re
+import time
+from urllib.parse import quote, urlsplit
+
+# Umbrales del recolector generacional. Cada petición crea miles de dicts
+# efímeros (GeoJSON decodificado, resúmenes); con el umbral por defecto (700)
+# la generación 0 se recolecta decenas de veces por petición.
+GC_THRESHOLDS = (50_000, 10, 10)
+
+# Conectar o esperar un hueco en el pool debe ser rápido; la lectura es lo que
+# tarda cuando el WMS tiene que renderizar la consulta
+CLIENT_TIMEOUT = httpx.Timeout(connect=5.0, read=20.0, write=5.0, pool=5.0)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Los objetos creados al importar (módulos, tablas, builders de URL) viven
+    # todo el proceso: se congelan para que el GC no los vuelva a recorrer.
+    gc.collect()
+    gc.freeze()
+    previous_thresholds = gc.get_threshold()
+    gc.set_threshold(*GC_THRESHOLDS)
+    # Cliente HTTP compartido por todo el proceso (app.state.http): reutiliza
+    # conexiones keep-alive (y multiplexa con HTTP/2) hacia mapama.gob.es,
+    # idee.es e ign.es en lugar de pagar el handshake TCP+TLS en cada consulta.
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        # keepalive_expiry amplio: entre ráfagas de consultas las conexiones
+        # (y sus sesiones TLS) siguen vivas en lugar de cerrarse a los 5 s
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100, keepalive_expiry=60.0),
+        timeout=CLIENT_TIMEOUT,
+        follow_redirects=True,
+    )
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        gc.set_threshold(*previous_thresholds)
+        gc.unfreeze()
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse serializada con orjson en lugar de json.dumps."""
 
-app = FastAPI(title="Risk Info API", version="1.6")
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+app = FastAPI(
+    title="Risk Info API",
+    version="1.6",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # =========================
 # Utilidades comunes
 # =========================
 
+_R = 6378137.0
+_DEG2RAD = math.pi / 180.0
+_DEG2M = _R * _DEG2RAD
+
+
+MERCATOR_DECIMALS = 6  # ~0,1 m: clics sobre el mismo píxel comparten entrada
+
+
 def to_webmercator(lat: float, lon: float):
     """Convierte lat/lon (grados WGS84) a Web Mercator (EPSG:3857)."""
-    R = 6378137.0
-    x = lon * (math.pi / 180.0) * R
-    y = math.log(math.tan((math.pi / 4.0) + (lat * math.pi / 360.0))) * R
-    return x, y
+    return _to_webmercator_cached(round(lat, MERCATOR_DECIMALS), round(lon, MERCATOR_DECIMALS))
+
+
+@functools.lru_cache(maxsize=4096)
+def _to_webmercator_cached(lat: float, lon: float):
+    # ln(tan(pi/4 + lat/2)) == asinh(tan(lat)): una función trascendente menos
+    return lon * _DEG2M, math.asinh(math.tan(lat * _DEG2RAD)) * _R
+
+
+def to_webmercator_batch(lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Versión vectorizada de to_webmercator para muchos puntos a la vez."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    return lons * _DEG2M, np.arcsinh(np.tan(lats * _DEG2RAD)) * _R
+
+
+_GFI_TEMPLATE = (
+    "{wms}?SERVICE=WMS&VERSION=1.3.0&REQUEST=GetFeatureInfo"
+    "&LAYERS={layer}&QUERY_LAYERS={layer}&CRS={crs}&BBOX={bbox}"
+    "&WIDTH={w}&HEIGHT={h}&I={i}&J={j}&INFO_FORMAT={fmt}&FEATURE_COUNT={fc}"
+)
+# El BBOX es lo único que cambia por punto: la plantilla se parte por él
+_GFI_HEAD, _GFI_TAIL = _GFI_TEMPLATE.split("{bbox}")
+
+
+def _gfi_template(
+    wms_url: str,
+    layer: str,
+    crs: str,
+    width: int = 256,
+    height: int = 256,
+    info_format: str = "application/json",
+    styles: Optional[str] = None,
+    feature_count: int = 10,
+    vendor_params: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, str]:
+    """Partes fijas de la URL GetFeatureInfo, antes y después del BBOX."""
+    params = {
+        "wms": wms_url,
+        # Los nombres de capa y estilo se escapan; la coma separa varios
+        "layer": quote(layer, safe=","),
+        "crs": crs,
+        "w": width,
+        "h": height,
+        "i": width // 2,
+        "j": height // 2,
+        "fmt": info_format,
+        "fc": feature_count,
+    }
+    tail = "".join((
+        _GFI_TAIL.format_map(params),
+        f"&STYLES={quote(styles, safe=',')}" if styles else "",
+        *(f"&{k}={v}" for k, v in (vendor_params or {}).items()),
+    ))
+    return _GFI_HEAD.format_map(params), tail
 
 
 def build_gfi_url(
@@ -31,87 +155,440 @@ def build_gfi_url(
     feature_count: int = 10,
     vendor_params: Optional[Dict[str, Any]] = None,
 ) -> str:
-    base = (
-        f"{wms_url}?SERVICE=WMS&VERSION=1.3.0&REQUEST=GetFeatureInfo"
-        f"&LAYERS={layer}&QUERY_LAYERS={layer}"
-        f"&CRS={crs}&BBOX={bbox}"
-        f"&WIDTH={width}&HEIGHT={height}"
-        f"&I={width//2}&J={height//2}"
-        f"&INFO_FORMAT={info_format}"
-        f"&FEATURE_COUNT={feature_count}"
+    prefix, suffix = _gfi_template(
+        wms_url, layer, crs, width, height, info_format, styles, feature_count, vendor_params
     )
-    if styles:
-        base += f"&STYLES={styles}"
-    if vendor_params:
-        for k, v in vendor_params.items():
-            base += f"&{k}={v}"
-    return base
+    return prefix + bbox + suffix
+
+
+# Las capas de riesgo son prácticamente estáticas: se cachean en memoria las
+# respuestas correctas (nunca los errores) durante CACHE_TTL segundos.
+CACHE_TTL = 3600
+CACHE_MAXSIZE = 10_000
+COORD_DECIMALS = 3  # ~100 m: clics cercanos comparten la misma entrada
+
+# Cada entrada es (payload, validadores). Mientras payload.fresh_until no ha
+# pasado se sirve sin tocar la red; después, si el servidor dio ETag o
+# Last-Modified, se revalida con If-None-Match / If-Modified-Since: un 304 no
+# trae cuerpo. La frescura la marca Cache-Control (max-age) cuando el servidor
+# lo envía y CACHE_TTL / 4 en otro caso.
+_wms_cache: TTLCache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+# Cada entrada es (fresca_hasta, resumen): la menor frescura de sus capas
+_summary_cache: TTLCache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+
+
+@dataclass(frozen=True)
+class RiskPayload:
+    """Respuesta de una capa ya clasificada: "ok" (JSON), "raw" (texto) o "error".
+
+    Los parsers descartan con un solo acceso a atributo lo que no es "ok", sin
+    recorrer el dict; data conserva el contenido tal cual para la respuesta.
+    fresh_until (time.monotonic) indica hasta cuándo puede reutilizarse sin
+    revalidar; 0 para errores y respuestas no cacheables.
+    """
+
+    __slots__ = ("kind", "data", "fresh_until")
+    kind: Literal["ok", "raw", "error"]
+    data: Any
+    fresh_until: float
+
+    @classmethod
+    def wrap(cls, obj: Any, fresh_until: float = 0.0) -> "RiskPayload":
+        if isinstance(obj, dict):
+            if "error" in obj:
+                return cls("error", obj, 0.0)
+            if "raw" in obj:
+                return cls("raw", obj, fresh_until)
+        return cls("ok", obj, fresh_until)
+
+
+class _AsyncBytesReader:
+    """Adapta r.aiter_bytes() a la interfaz read() asíncrona que espera ijson.
+
+    Guarda los trozos leídos para poder decodificar el cuerpo completo por la
+    vía normal si resulta no ser una FeatureCollection (ver body()).
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks
+        self._seen: List[bytes] = []
+
+    async def read(self, n: int = -1) -> bytes:
+        if n == 0:
+            return b""
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+        self._seen.append(chunk)
+        return chunk
 
+    async def body(self) -> bytes:
+        """Cuerpo completo: lo ya leído más lo que quede por llegar."""
+        async for chunk in self._chunks:
+            self._seen.append(chunk)
+        return b"".join(self._seen)
 
-async def fetch_any(client: httpx.AsyncClient, urls: List[str]) -> Dict[str, Any]:
-    last_err = None
-    for u in urls:
-        try:
-            r = await client.get(u, follow_redirects=True, timeout=25.0)
-            r.raise_for_status()
-            try:
-                return r.json()
-            except Exception:
-                return {"raw": r.text}
-        except Exception as e:
-            last_err = str(e)
-    return {"error": last_err or "unknown error"}
-
-
-def remove_geometry_from_geojson(obj: Dict[str, Any]) -> Dict[str, Any]:
-    if not isinstance(obj, dict):
-        return obj
-    if obj.get("type") == "FeatureCollection":
-        feats = []
-        for f in obj.get("features", []):
-            if isinstance(f, dict):
-                feats.append({k: v for k, v in f.items() if k != "geometry"})
+
+# Por encima de este tamaño el JSON se decodifica de forma incremental según
+# llegan los trozos, cediendo el bucle de eventos entre uno y otro. Mandarlo a
+# un hilo no serviría: orjson mantiene el GIL mientras construye el resultado.
+LARGE_BODY_BYTES = 256 * 1024
+# Content-Length es el tamaño comprimido: con Content-Encoding se estima el
+# descomprimido con esta proporción, habitual en GeoJSON con gzip.
+COMPRESSION_RATIO = 10
+
+# (payload, cabeceras de respuesta); payload es None cuando el servidor respondió 304
+Fetched = Tuple[Optional[Dict[str, Any]], httpx.Headers]
+
+# (ETag, Last-Modified) de la última respuesta completa
+Validators = Tuple[Optional[str], Optional[str]]
+NO_VALIDATORS: Validators = (None, None)
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)")
+
+
+def _conditional_headers(validators: Validators) -> Optional[Dict[str, str]]:
+    etag, last_modified = validators
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers or None
+
+
+UPSTREAM_ATTEMPTS = 3
+
+# Lectura máxima por intento según el servidor (sufijo del host). Un intento
+# lento se corta pronto y deja sitio al reintento o al resto de capas. El resto
+# de límites, y todos los de otros hosts, son los del cliente (CLIENT_TIMEOUT).
+HTTP_TIMEOUTS = {"mapama.gob.es": 4.0, "idee.es": 4.0, "ign.es": 4.0}
+
+
+@functools.lru_cache(maxsize=64)
+def _host_timeout(host: str) -> Any:
+    read = next(
+        (t for suffix, t in HTTP_TIMEOUTS.items() if host == suffix or host.endswith("." + suffix)),
+        None,
+    )
+    if read is None:
+        return httpx.USE_CLIENT_DEFAULT
+    return httpx.Timeout(
+        connect=CLIENT_TIMEOUT.connect, read=read, write=CLIENT_TIMEOUT.write, pool=CLIENT_TIMEOUT.pool
+    )
+
+
+def _timeout_for(url: str) -> Any:
+    return _host_timeout(urlsplit(url).hostname or "")
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """5xx o fallo de red: merece reintento. Los 4xx no van a cambiar.
+
+    Los timeouts tampoco se reintentan: ya han consumido su presupuesto entero.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError) and not isinstance(exc, httpx.TimeoutException)
+
+
+# Reintento con backoff exponencial y jitter para los servidores WMS inestables
+_retry_transient = retry(
+    stop=stop_after_attempt(UPSTREAM_ATTEMPTS),
+    wait=wait_exponential_jitter(initial=0.2, max=2.0, jitter=0.2),
+    retry=retry_if_exception(_is_transient),
+    reraise=True,
+)
+
+
+def _strip_geometry(doc: Any) -> Any:
+    """Quita en sitio las geometrías de un GeoJSON recién decodificado.
+
+    Ningún parser ni respuesta las usa; quitarlas antes de cachear reduce la
+    memoria de cada entrada a las propiedades.
+    """
+    if isinstance(doc, dict):
+        if doc.get("type") == "FeatureCollection":
+            for f in doc.get("features") or ():
+                if isinstance(f, dict):
+                    f.pop("geometry", None)
+        elif doc.get("type") == "Feature":
+            doc.pop("geometry", None)
+    return doc
+
+
+def _decode_body(r: httpx.Response, body: bytes) -> Any:
+    """JSON sin geometrías o, si el cuerpo no es JSON, {"raw": texto}."""
+    try:
+        return _strip_geometry(orjson.loads(body))
+    except orjson.JSONDecodeError:
+        return {"raw": body.decode(r.encoding or "utf-8", errors="replace")}
+
+
+def _is_json(r: httpx.Response) -> bool:
+    return "json" in r.headers.get("content-type", "")
+
+
+def _is_large(r: httpx.Response) -> bool:
+    """Si el cuerpo ya descomprimido puede pasar de LARGE_BODY_BYTES.
+
+    Sin Content-Length (respuesta chunked) no se sabe y se trata como grande.
+    """
+    try:
+        size = int(r.headers["content-length"])
+    except (KeyError, ValueError):
+        return True
+    if r.headers.get("content-encoding", "identity").lower() != "identity":
+        size *= COMPRESSION_RATIO
+    return size > LARGE_BODY_BYTES
+
+
+async def _stream_features(r: httpx.Response, limit: Optional[int] = None) -> Any:
+    """Decodifica en streaming los features de una FeatureCollection, sin geometría.
+
+    Cada geometría se suelta según se lee; con limit la descarga se corta al
+    llegar a ese número de features. Lo que no sea una FeatureCollection con
+    features (un Feature suelto, un error JSON, JSON mal formado) se decodifica
+    entero con _decode_body, igual que un cuerpo pequeño.
+    """
+    reader = _AsyncBytesReader(r.aiter_bytes())
+    feats: List[Any] = []
+    try:
+        async for feat in ijson.items_async(reader, "features.item", use_float=True):
+            if isinstance(feat, dict):
+                feat.pop("geometry", None)
+            feats.append(feat)
+            if len(feats) == limit:
+                break
+        else:
+            # Leído hasta el final: solo así la conexión HTTP/1.1 vuelve al pool
+            await reader.body()
+    except ijson.JSONError:
+        feats = []  # se resuelve abajo como texto, igual que con orjson
+    if feats:
         return {"type": "FeatureCollection", "features": feats}
-    if obj.get("type") == "Feature":
-        return {k: v for k, v in obj.items() if k != "geometry"}
+    return _decode_body(r, await reader.body())
+
+
+@_retry_transient
+async def _get_payload(
+    client: httpx.AsyncClient, url: str, validators: Validators = NO_VALIDATORS
+) -> Fetched:
+    async with client.stream(
+        "GET", url, headers=_conditional_headers(validators), timeout=_timeout_for(url)
+    ) as r:
+        if r.status_code == 304:
+            return None, r.headers
+        r.raise_for_status()
+        if r.headers.get("content-type", "").startswith("text/plain"):
+            await r.aread()
+            return {"raw": r.text}, r.headers
+        if _is_json(r) and _is_large(r):
+            # Los cuerpos grandes son colecciones con geometrías pesadas: se
+            # decodifican feature a feature y cada geometría se suelta al
+            # momento, así nunca están todas las coordenadas en memoria.
+            return await _stream_features(r), r.headers
+        await r.aread()
+    return _decode_body(r, r.content), r.headers
+
+
+def _first_feature(doc: Any) -> Any:
+    """Recorta una colección ya decodificada a su primer feature, como
+    _stream_features(limit=1); el resto de documentos se devuelve igual."""
+    if isinstance(doc, dict) and isinstance(doc.get("features"), list) and doc["features"]:
+        return {"type": "FeatureCollection", "features": doc["features"][:1]}
+    return doc
+
+
+@_retry_transient
+async def _get_first_feature(
+    client: httpx.AsyncClient, url: str, validators: Validators = NO_VALIDATORS
+) -> Fetched:
+    """Devuelve solo el primer feature; en cuerpos grandes corta la descarga ahí.
+
+    Para los parsers que únicamente miran features[0]. Un cuerpo pequeño se
+    lee entero: cortarlo a medias cerraría la conexión HTTP/1.1 en lugar de
+    devolverla al pool. Lo que no sea una FeatureCollection con features
+    (HTML, XML, un Feature suelto, un error JSON) se decodifica entero igual
+    que en _get_payload.
+    """
+    async with client.stream(
+        "GET", url, headers=_conditional_headers(validators), timeout=_timeout_for(url)
+    ) as r:
+        if r.status_code == 304:
+            return None, r.headers
+        r.raise_for_status()
+        if r.headers.get("content-type", "").startswith("text/plain"):
+            await r.aread()
+            return {"raw": r.text}, r.headers
+        if not (_is_json(r) and _is_large(r)):
+            await r.aread()
+            return _first_feature(_decode_body(r, r.content)), r.headers
+        return await _stream_features(r, limit=1), r.headers
+
+
+def _max_age(headers: httpx.Headers) -> Optional[float]:
+    """Segundos que la respuesta puede servirse sin revalidar según Cache-Control.
+
+    None si el servidor no lo indica; 0 con no-cache. Se descuenta Age (lo que
+    la respuesta ya lleva en cachés intermedias) y nunca supera CACHE_TTL.
+    """
+    cc = headers.get("cache-control", "").lower()
+    if "no-cache" in cc:
+        return 0.0
+    m = _MAX_AGE_RE.search(cc)
+    if m is None:
+        return None
+    try:
+        age = float(headers.get("age", 0))
+    except ValueError:
+        age = 0.0
+    return min(max(float(m.group(1)) - age, 0.0), CACHE_TTL)
+
+
+async def fetch_any(
+    client: httpx.AsyncClient,
+    url: str,
+    first_only: bool = False,
+    sem: Optional[asyncio.Semaphore] = None,
+) -> RiskPayload:
+    """Respuesta de una capa (cacheada).
+
+    Con first_only=True solo se descarga el primer feature (ver _get_first_feature).
+    Con sem, la petición al servidor espera turno en él; los aciertos de
+    caché no lo ocupan.
+    """
+    key = (first_only, url)
+    entry = _wms_cache.get(key)
+    validators = NO_VALIDATORS
+    if entry is not None:
+        cached, validators = entry
+        if time.monotonic() < cached.fresh_until:
+            return cached
+
+    get = _get_first_feature if first_only else _get_payload
+    try:
+        async with sem or nullcontext():
+            data, headers = await get(client, url, validators)
+    except Exception as e:
+        if entry is not None:
+            return entry[0]  # sigue dentro de su TTL
+        return RiskPayload("error", {"error": str(e) or "unknown error"}, 0.0)
+    no_store = "no-store" in headers.get("cache-control", "").lower()
+    if no_store:
+        # Ni la capa ni un resumen que dependa de ella se guardan
+        _wms_cache.pop(key, None)
+        fresh_until = 0.0
+    else:
+        # Un 304 puede omitir los validadores: se conservan los que ya teníamos
+        old_etag, old_modified = validators if data is None else NO_VALIDATORS
+        validators = (headers.get("etag", old_etag), headers.get("last-modified", old_modified))
+        max_age = _max_age(headers)
+        if max_age is None:
+            # Sin Cache-Control: sin validadores no hay forma barata de revalidar
+            # y la entrada vive hasta que caduque en la TTLCache
+            max_age = CACHE_TTL / 4 if any(validators) else math.inf
+        fresh_until = time.monotonic() + max_age
+    if data is None:  # 304: mismo contenido, nueva frescura
+        payload = replace(entry[0], fresh_until=fresh_until)
+    else:
+        payload = RiskPayload.wrap(data, fresh_until)
+    if not no_store and payload.kind != "error":
+        _wms_cache[key] = (payload, validators)
+    return payload
+
+
+def geojson_view(obj: Any) -> Any:
+    """Forma de sin_geometria para un payload que ya pasó por _strip_geometry.
+
+    Las geometrías se quitaron al decodificar, así que no hace falta recorrer
+    los features otra vez: solo se recorta el nivel superior de la colección.
+    """
+    if isinstance(obj, dict) and obj.get("type") == "FeatureCollection":
+        return {"type": "FeatureCollection", "features": obj.get("features", [])}
     return obj
 
 
+def first_feature_props(obj: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Propiedades del primer feature, sin recorrer ni copiar el resto de la colección."""
+    feats = obj.get("features") if isinstance(obj, dict) else None
+    if not feats or not isinstance(feats, list) or not isinstance(feats[0], dict):
+        return None
+    props = feats[0].get("properties")
+    if props is None:
+        return {k: v for k, v in feats[0].items() if k != "geometry"}
+    return props if isinstance(props, dict) else None
+
+
 # =========================
 # Normalizadores / Parsers
 # =========================
 
-def parse_incendios_summary(obj: Dict[str, Any]) -> Dict[str, Any]:
-    if not isinstance(obj, dict) or obj.get("error"):
-        return {"resumen": "desconocido", "fuente": "MITECO", "raw": obj}
+# Umbrales de clasificación: bisect_right(umbrales, v) indexa la etiqueta.
+_INCENDIOS_THRESHOLDS = (5, 20)
+_INCENDIOS_LABELS = ("bajo", "medio", "alto")
+_PGA_THRESHOLDS = (0.04, 0.08)
+_PGA_LABELS = ("bajo", "medio", "alto")
+_DESERT_THRESHOLDS = (50, 100)
+_DESERT_LABELS = ("bajo", "medio", "alto")
+_NUM_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+# Alias con los que cada servicio publica el mismo campo, en orden de preferencia
+_INCENDIO_NAME_KEYS = ("municipio", "MUNICIPIO", "name", "NAMEUNIT", "NOMBRE")
+_INCENDIO_FREQ_KEYS = ("frecuencia", "N_INCENDIOS", "num_incendios")
+_PGA_KEYS_ORDERED = ("PGA", "pga", "aceleracion", "ACCEL", "amax")
+_PGA_KEYS = frozenset(_PGA_KEYS_ORDERED)
+
+
+def _level(value: float, thresholds: Tuple[float, ...], labels: Tuple[str, ...]) -> str:
+    return labels[bisect.bisect_right(thresholds, value)]
+
+
+def _alias_getter(keys: Tuple[str, ...]) -> Callable[[Dict[str, Any]], Any]:
+    """Devuelve f(props) == props.get(k1) or props.get(k2) or ... para keys.
 
-    fc = remove_geometry_from_geojson(obj)
-    feats = fc.get("features", []) if isinstance(fc, dict) else []
-    if not feats:
+    Se genera una vez por tabla de alias. Si ningún alias está presente basta
+    un isdisjoint (un hash por propiedad); si no, map/filter/next recorren las
+    claves en C en orden de preferencia.
+    """
+    key_set = frozenset(keys)
+    last = keys[-1]
+
+    def get(props: Dict[str, Any]) -> Any:
+        if key_set.isdisjoint(props):
+            return None
+        # El valor por defecto reproduce `or`: si todos son falsy, el del último
+        return next(filter(None, map(props.get, keys)), props.get(last))
+
+    return get
+
+
+_incendio_name = _alias_getter(_INCENDIO_NAME_KEYS)
+_incendio_freq = _alias_getter(_INCENDIO_FREQ_KEYS)
+
+
+def parse_incendios_summary(payload: RiskPayload) -> Dict[str, Any]:
+    if payload.kind == "error":
+        return {"resumen": "desconocido", "fuente": "MITECO", "raw": payload.data}
+
+    props = first_feature_props(payload.data) if payload.kind == "ok" else None
+    if props is None:
         return {"resumen": "sin_datos", "fuente": "MITECO"}
 
-    props = feats[0].get("properties", feats[0])
-    municipio = (
-        props.get("municipio") or props.get("MUNICIPIO")
-        or props.get("name") or props.get("NAMEUNIT")
-        or props.get("NOMBRE")
-    )
-    freq = props.get("frecuencia") or props.get("N_INCENDIOS") or props.get("num_incendios")
+    municipio = _incendio_name(props)
+    freq = _incendio_freq(props)
 
     nivel = None
-    try:
-        if freq is not None:
+    if freq is not None:
+        try:
             f = float(freq)
-            if f == 0:
-                nivel = "ninguno"
-            elif f < 5:
-                nivel = "bajo"
-            elif f < 20:
-                nivel = "medio"
-            else:
-                nivel = "alto"
-    except Exception:
-        pass
+        except (TypeError, ValueError):
+            f = None
+        if f == 0:
+            nivel = "ninguno"
+        elif f is not None:
+            nivel = _level(f, _INCENDIOS_THRESHOLDS, _INCENDIOS_LABELS)
 
     out = {"fuente": "MITECO", "municipio": municipio}
     if nivel:
@@ -123,144 +600,289 @@ def parse_incendios_summary(obj: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
-NODATA = -3.4028234663852886e+38
+# El raster marca NoData con -FLT_MAX (-3.4028234663852886e+38). A esa
+# magnitud una tolerancia absoluta no tiene sentido (el ULP es ~1e22):
+# cualquier valor por debajo del umbral es ese centinela.
+_NODATA_FLOOR = -1e30
+
 
-def inundable_from_gray(fc: Dict[str, Any]) -> str:
+def gray_value(payload: RiskPayload) -> float:
+    """GRAY_INDEX del primer feature; NaN si falta o no es numérico."""
+    if payload.kind != "ok":
+        return math.nan
+    props = first_feature_props(payload.data)
     try:
-        feats = fc.get("features", [])
-        if not feats:
-            return "nodata"
-        gray = feats[0].get("properties", {}).get("GRAY_INDEX", None)
-        if gray is None:
-            return "nodata"
-        if isinstance(gray, (int, float)):
-            if gray == 0:
-                return "no_inundable"
-            if abs(gray - NODATA) < 1e-6:
-                return "nodata"
-            return "inundable"
-        g = float(gray)
-        if g == 0:
-            return "no_inundable"
-        if abs(g - NODATA) < 1e-6:
-            return "nodata"
-        return "inundable"
-    except Exception:
+        return float(props["GRAY_INDEX"])
+    except (TypeError, KeyError, ValueError):
+        return math.nan
+
+
+def inundable_from_gray(payload: RiskPayload) -> str:
+    g = gray_value(payload)
+    # `not >=` también es cierto para NaN (dato ausente)
+    if not g >= _NODATA_FLOOR:
         return "nodata"
+    return "no_inundable" if g == 0.0 else "inundable"
 
 
-def parse_sismico_summary(obj: Dict[str, Any]) -> Dict[str, Any]:
-    try:
-        fc = remove_geometry_from_geojson(obj)
-        feats = fc.get("features", [])
-        if not feats:
-            return {"riesgo_sismico": "sin_riesgo"}
-        props = feats[0].get("properties", feats[0])
-        pga = None
-        for key in ("PGA", "pga", "aceleracion", "ACCEL", "amax"):
-            if key in props:
-                try:
-                    pga = float(props[key])
-                    break
-                except Exception:
-                    pass
-        if pga is None:
-            return {"riesgo_sismico": "sin_riesgo"}
-        if pga < 0.04:
-            nivel = "bajo"
-        elif pga < 0.08:
-            nivel = "medio"
-        else:
-            nivel = "alto"
-        return {"pga": pga, "riesgo_sismico": nivel}
-    except Exception:
+def pga_value(payload: RiskPayload) -> Optional[float]:
+    if payload.kind != "ok":
+        return None
+    props = first_feature_props(payload.data)
+    if props is None:
+        return None
+    hit = _PGA_KEYS.intersection(props)
+    for key in (k for k in _PGA_KEYS_ORDERED if k in hit):
+        try:
+            return float(props[key])
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def parse_sismico_summary(payload: RiskPayload) -> Dict[str, Any]:
+    pga = pga_value(payload)
+    if pga is None:
         return {"riesgo_sismico": "sin_riesgo"}
+    nivel = _level(pga, _PGA_THRESHOLDS, _PGA_LABELS)
+    return {"pga": pga, "riesgo_sismico": nivel}
 
 
-def parse_desertificacion_summary(obj: Dict[str, Any], tipo: str) -> Dict[str, Any]:
-    if not isinstance(obj, dict) or obj.get("error"):
-        return {"tipo": tipo, "nivel": "nodata", "raw": obj}
+def parse_desertificacion_summary(payload: RiskPayload, tipo: str) -> Dict[str, Any]:
+    if payload.kind != "raw":
+        return {"tipo": tipo, "nivel": "nodata", "raw": payload.data}
 
-    raw = obj.get("raw")
+    raw = payload.data["raw"]
     if raw:
-        match = re.search(r"(-?\d+(\.\d+)?)", raw)
+        match = _NUM_RE.search(raw)
         if match:
-            valor = float(match.group(1))
+            valor = float(match.group(0))
             if valor <= 0:
                 nivel = "nodata"
-            elif valor < 50:
-                nivel = "bajo"
-            elif valor < 100:
-                nivel = "medio"
             else:
-                nivel = "alto"
+                nivel = _level(valor, _DESERT_THRESHOLDS, _DESERT_LABELS)
             return {"tipo": tipo, "valor": valor, "nivel": nivel}
         else:
             return {"tipo": tipo, "nivel": "nodata", "raw": raw}
 
-    return {"tipo": tipo, "nivel": "nodata", "raw": obj}
+    return {"tipo": tipo, "nivel": "nodata", "raw": payload.data}
 
 
 # =========================
-# Core fetch
+# Clasificación por lotes (NumPy)
 # =========================
 
-async def fetch_all_risks(lat: float, lon: float) -> Dict[str, Any]:
-    results: Dict[str, Any] = {}
-    async with httpx.AsyncClient() as client:
-        d_deg = 0.20
-        bbox_c84_small = f"{lon - d_deg},{lat - d_deg},{lon + d_deg},{lat + d_deg}"
+def classify_gray_batch(grays: np.ndarray) -> List[str]:
+    """Versión vectorizada de inundable_from_gray sobre un array de GRAY_INDEX."""
+    nodata = ~(grays >= _NODATA_FLOOR)  # NaN incluido
+    labels = np.where(nodata, "nodata", np.where(grays == 0, "no_inundable", "inundable"))
+    return labels.tolist()
 
-        # Incendios
-        url_inc = build_gfi_url(
-            "https://wms.mapama.gob.es/sig/Biodiversidad/Incendios/2006_2015",
-            "NZ.HazardArea", bbox=bbox_c84_small, crs="CRS:84",
-            info_format="application/json", styles="Biodiversidad_Incendios"
-        )
-        results["incendios"] = await fetch_any(client, [url_inc])
-
-        # Inundación fluvial
-        results["inundacion_fluvial"] = {}
-        for periodo in ["T10", "T100", "T500"]:
-            url = build_gfi_url(
-                "https://servicios.idee.es/wms-inspire/riesgos-naturales/inundaciones",
-                f"NZ.Flood.Fluvial{periodo}", bbox=bbox_c84_small, crs="CRS:84",
-                info_format="application/json"
-            )
-            results["inundacion_fluvial"][periodo] = await fetch_any(client, [url])
-
-        # Inundación marina
-        results["inundacion_marina"] = {}
-        for periodo in ["T100", "T500"]:
-            url = build_gfi_url(
-                "https://servicios.idee.es/wms-inspire/riesgos-naturales/inundaciones",
-                f"NZ.Flood.Marina{periodo}", bbox=bbox_c84_small, crs="CRS:84",
-                info_format="application/json"
-            )
-            results["inundacion_marina"][periodo] = await fetch_any(client, [url])
-
-        # Sísmico
-        url_sismico = build_gfi_url(
-            "https://www.ign.es/wms-inspire/geofisica",
-            "HazardArea2002.NCSE-02", bbox=bbox_c84_small, crs="CRS:84",
-            info_format="application/json"
-        )
-        results["sismico"] = await fetch_any(client, [url_sismico])
 
-        # Desertificación (potencial + laminar, usando text/plain)
-        url_des_pot = build_gfi_url(
-            "https://wms.mapama.gob.es/sig/Biodiversidad/INESErosionPotencial/wms.aspx",
-            "NZ.HazardArea", bbox=bbox_c84_small, crs="CRS:84",
-            info_format="text/plain"
-        )
-        url_des_lam = build_gfi_url(
-            "https://wms.mapama.gob.es/sig/Biodiversidad/INESErosionLaminarRaster/wms.aspx",
-            "NZ.HazardArea", bbox=bbox_c84_small, crs="CRS:84",
-            info_format="text/plain"
-        )
-        results["desertificacion_potencial"] = await fetch_any(client, [url_des_pot])
-        results["desertificacion_laminar"] = await fetch_any(client, [url_des_lam])
+def classify_pga_batch(pgas: List[Optional[float]]) -> List[Dict[str, Any]]:
+    """Versión vectorizada de parse_sismico_summary sobre valores de PGA ya extraídos."""
+    valid = np.fromiter((p is not None for p in pgas), dtype=bool, count=len(pgas))
+    values = np.fromiter((p if p is not None else 0.0 for p in pgas), dtype=np.float64, count=len(pgas))
+    idx = np.searchsorted(_PGA_THRESHOLDS, values, side="right")
+    return [
+        {"pga": pga, "riesgo_sismico": _PGA_LABELS[i]} if ok else {"riesgo_sismico": "sin_riesgo"}
+        for pga, i, ok in zip(pgas, idx.tolist(), valid.tolist())
+    ]
+
+
+# =========================
+# Core fetch
+# =========================
 
+FLOOD_WMS = "https://servicios.idee.es/wms-inspire/riesgos-naturales/inundaciones"
+
+# Capas ráster de inundación: solo interesa GRAY_INDEX, así que se piden en
+# text/plain (unos pocos bytes) en lugar de un GeoJSON con geometría.
+FLOOD_LAYERS = {
+    "inundacion_fluvial": ("NZ.Flood.Fluvial", ("T10", "T100", "T500")),
+    "inundacion_marina": ("NZ.Flood.Marina", ("T100", "T500")),
+}
+
+_GRAY_INDEX_RE = re.compile(r"GRAY_INDEX\s*=\s*([-\d.eE+]+)")
+
+BBOX_HALF_DEG = 0.20
+
+
+@functools.lru_cache(maxsize=1024)
+def bbox_crs84(lat: float, lon: float, h: float = BBOX_HALF_DEG) -> str:
+    """BBOX CRS:84 (lon/lat) de semilado h alrededor del punto.
+
+    Todas las capas de un punto comparten el mismo BBOX: se formatea una vez.
+    """
+    return f"{lon - h},{lat - h},{lon + h},{lat + h}"
+
+
+@dataclass(frozen=True)
+class LayerSpec:
+    """URL GetFeatureInfo de una capa, precalculada salvo el BBOX.
+
+    Todo salvo el punto se resuelve una vez al importar; llamar a la instancia
+    con (lat, lon) solo concatena el BBOX entre las partes fijas.
+    """
+
+    __slots__ = ("prefix", "suffix")
+    prefix: str
+    suffix: str
+
+    @classmethod
+    def for_layer(cls, wms_url: str, layer: str, **kwargs: Any) -> "LayerSpec":
+        return cls(*_gfi_template(wms_url, layer, "CRS:84", **kwargs))
+
+    def __call__(self, lat: float, lon: float) -> str:
+        return self.prefix + bbox_crs84(lat, lon) + self.suffix
+
+
+URL_BUILDERS: Dict[str, LayerSpec] = {
+    "incendios": LayerSpec.for_layer(
+        "https://wms.mapama.gob.es/sig/Biodiversidad/Incendios/2006_2015",
+        "NZ.HazardArea", info_format="application/json", styles="Biodiversidad_Incendios",
+    ),
+    "sismico": LayerSpec.for_layer(
+        "https://www.ign.es/wms-inspire/geofisica",
+        "HazardArea2002.NCSE-02", info_format="application/json",
+    ),
+    # Desertificación (potencial + laminar, usando text/plain)
+    "desertificacion_potencial": LayerSpec.for_layer(
+        "https://wms.mapama.gob.es/sig/Biodiversidad/INESErosionPotencial/wms.aspx",
+        "NZ.HazardArea", info_format="text/plain",
+    ),
+    "desertificacion_laminar": LayerSpec.for_layer(
+        "https://wms.mapama.gob.es/sig/Biodiversidad/INESErosionLaminarRaster/wms.aspx",
+        "NZ.HazardArea", info_format="text/plain",
+    ),
+}
+
+# (grupo, periodo) -> (capa text/plain, capa JSON de respaldo)
+FLOOD_URL_BUILDERS: Dict[Tuple[str, str], Tuple[LayerSpec, LayerSpec]] = {
+    (grupo, periodo): (
+        LayerSpec.for_layer(FLOOD_WMS, f"{prefijo}{periodo}", info_format="text/plain"),
+        LayerSpec.for_layer(FLOOD_WMS, f"{prefijo}{periodo}", info_format="application/json"),
+    )
+    for grupo, (prefijo, periodos) in FLOOD_LAYERS.items()
+    for periodo in periodos
+}
+
+# Capas que devuelven GeoJSON y admiten lectura hasta el primer feature
+GEOJSON_LAYERS = frozenset({"incendios", "sismico"})
+
+# Tiempo máximo para reunir todas las capas de un punto
+FETCH_BUDGET = 10.0
+
+
+async def fetch_gray_index(
+    client: httpx.AsyncClient,
+    plain_url: str,
+    json_url: str,
+    sem: Optional[asyncio.Semaphore] = None,
+) -> RiskPayload:
+    """Lee GRAY_INDEX en text/plain; si el servidor no lo devuelve, vuelve a JSON.
+
+    El resultado mantiene la forma de FeatureCollection que esperan
+    inundable_from_gray y la salida sin_geometria.
+    """
+    plain = await fetch_any(client, plain_url, sem=sem)
+    match = _GRAY_INDEX_RE.search(plain.data["raw"] or "") if plain.kind == "raw" else None
+    if match:
+        try:
+            gray = float(match.group(1))
+        except ValueError:
+            pass
+        else:
+            return RiskPayload("ok", {
+                "type": "FeatureCollection",
+                "features": [{"type": "Feature", "properties": {"GRAY_INDEX": gray}}],
+            }, plain.fresh_until)
+    return await fetch_any(client, json_url, sem=sem)
+
+
+def summary_deadline(raw: Dict[str, Any]) -> float:
+    """Menor frescura entre las capas de un punto: hasta cuándo vale su resumen.
+
+    Un error, una capa no-store o no-cache, o una servida caducada por fallo
+    del servidor la dejan en el pasado, y el resumen no se cachea.
+    """
+    deadline = math.inf
+    for key, value in raw.items():
+        payloads = value.values() if key in FLOOD_LAYERS else (value,)
+        for p in payloads:
+            deadline = min(deadline, p.fresh_until)
+    return deadline
+
+
+# Descargas en curso por punto redondeado: las peticiones simultáneas sobre el
+# mismo punto esperan a la misma pasada en lugar de lanzar cada una la suya.
+_inflight: Dict[Tuple[float, float, bool], "asyncio.Task[Dict[str, Any]]"] = {}
+
+
+async def fetch_all_risks(
+    lat: float,
+    lon: float,
+    client: httpx.AsyncClient,
+    first_only: bool = False,
+    sem: Optional[asyncio.Semaphore] = None,
+) -> Dict[str, Any]:
+    """Descarga todas las capas para un punto con el cliente compartido.
+
+    first_only=True sirve a quien solo necesita el resumen: las capas GeoJSON
+    se leen en streaming hasta el primer feature en lugar de completas. sem
+    limita las peticiones al servidor en vuelo (ver api_risk_batch).
+    """
+    # Redondear antes de construir las URLs para que la clave de caché sea estable
+    key = (round(lat, COORD_DECIMALS), round(lon, COORD_DECIMALS), first_only)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_all(client, *key, sem))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: si un cliente se desconecta no se cancela la descarga compartida
+    return await asyncio.shield(task)
+
+
+async def _fetch_all(
+    client: httpx.AsyncClient,
+    lat: float,
+    lon: float,
+    first_only: bool,
+    sem: Optional[asyncio.Semaphore],
+) -> Dict[str, Any]:
+    # Pares (clave, corrutina); las capas de inundación usan (grupo, periodo)
+    tasks: List[Tuple[Any, Awaitable[RiskPayload]]] = [
+        (name, fetch_any(client, build(lat, lon), first_only and name in GEOJSON_LAYERS, sem))
+        for name, build in URL_BUILDERS.items()
+    ] + [
+        (key, fetch_gray_index(client, plain(lat, lon), json_(lat, lon), sem))
+        for key, (plain, json_) in FLOOD_URL_BUILDERS.items()
+    ]
+
+    # Todas las capas son independientes: se lanzan a la vez y la latencia
+    # total pasa a ser la de la capa más lenta, no la suma de todas. Pasado
+    # FETCH_BUDGET se responde con lo que haya: las capas pendientes se
+    # cancelan y quedan como error (y el resumen no se cachea).
+    futures = [asyncio.ensure_future(coro) for _, coro in tasks]
+    _, pending = await asyncio.wait(futures, timeout=FETCH_BUDGET)
+    for fut in pending:
+        fut.cancel()
+    if pending:
+        await asyncio.wait(pending)
+
+    results: Dict[str, Any] = {grupo: {} for grupo in FLOOD_LAYERS}
+    for (key, _), fut in zip(tasks, futures):
+        if fut in pending:
+            value = RiskPayload("error", {"error": f"sin respuesta en {FETCH_BUDGET:g} s"}, 0.0)
+        elif fut.exception() is not None:
+            value = RiskPayload("error", {"error": str(fut.exception())}, 0.0)
+        else:
+            value = fut.result()
+        if isinstance(key, tuple):
+            grupo, periodo = key
+            results[grupo][periodo] = value
+        else:
+            results[key] = value
     return results
 
 
@@ -270,43 +892,127 @@ async def fetch_all_risks(lat: float, lon: float) -> Dict[str, Any]:
 
 @app.get("/api/risk_clean")
 async def api_risk_clean(
+    request: Request,
     lat: float = Query(..., description="Latitud WGS84"),
     lon: float = Query(..., description="Longitud WGS84"),
+    include_raw: bool = Query(False, description="Incluir las respuestas de origen sin geometría"),
 ):
     try:
-        raw = await fetch_all_risks(lat, lon)
+        # Los parsers son deterministas: con los mismos datos de origen el
+        # resumen es el mismo, así que también se cachea ya interpretado.
+        key = (round(lat, COORD_DECIMALS), round(lon, COORD_DECIMALS), include_raw)
+        cached = _summary_cache.get(key)
+        if cached is not None and time.monotonic() < cached[0]:
+            return {"lat": lat, "lon": lon, **cached[1]}
+
+        # Sin include_raw solo hace falta el primer feature de cada capa: los
+        # parsers no miran más allá, y _get_first_feature decodifica lo que no
+        # sea una FeatureCollection igual que _get_payload, así que el resumen
+        # no depende de include_raw.
+        raw = await fetch_all_risks(lat, lon, request.app.state.http, first_only=not include_raw)
 
         out = {"lat": lat, "lon": lon, "resumen": {}}
 
         # Incendios
-        out["resumen"]["incendios"] = parse_incendios_summary(raw.get("incendios", {}))
+        out["resumen"]["incendios"] = parse_incendios_summary(raw["incendios"])
 
         # Inundaciones
-        inf = raw.get("inundacion_fluvial", {})
+        inf = raw["inundacion_fluvial"]
         out["resumen"]["inundacion_fluvial"] = {k: inundable_from_gray(v) for k, v in inf.items()}
 
-        im = raw.get("inundacion_marina", {})
+        im = raw["inundacion_marina"]
         out["resumen"]["inundacion_marina"] = {k: inundable_from_gray(v) for k, v in im.items()}
 
         # Sismico
-        out["resumen"]["sismico"] = parse_sismico_summary(raw.get("sismico", {}))
+        out["resumen"]["sismico"] = parse_sismico_summary(raw["sismico"])
 
         # Desertificación
         out["resumen"]["desertificacion"] = {
-            "potencial": parse_desertificacion_summary(raw.get("desertificacion_potencial", {}), "potencial"),
-            "laminar": parse_desertificacion_summary(raw.get("desertificacion_laminar", {}), "laminar"),
+            "potencial": parse_desertificacion_summary(raw["desertificacion_potencial"], "potencial"),
+            "laminar": parse_desertificacion_summary(raw["desertificacion_laminar"], "laminar"),
         }
 
-        # Versión sin geometría
-        out["sin_geometria"] = {
-            "incendios": remove_geometry_from_geojson(raw.get("incendios", {})),
-            "inundacion_fluvial": {k: remove_geometry_from_geojson(v) for k, v in inf.items()},
-            "inundacion_marina": {k: remove_geometry_from_geojson(v) for k, v in im.items()},
-            "sismico": remove_geometry_from_geojson(raw.get("sismico", {})),
-            "desertificacion_potencial": raw.get("desertificacion_potencial", {}),
-            "desertificacion_laminar": raw.get("desertificacion_laminar", {}),
-        }
+        # Versión sin geometría, solo si se pide
+        if include_raw:
+            out["sin_geometria"] = {
+                "incendios": geojson_view(raw["incendios"].data),
+                "inundacion_fluvial": {k: geojson_view(v.data) for k, v in inf.items()},
+                "inundacion_marina": {k: geojson_view(v.data) for k, v in im.items()},
+                "sismico": geojson_view(raw["sismico"].data),
+                "desertificacion_potencial": raw["desertificacion_potencial"].data,
+                "desertificacion_laminar": raw["desertificacion_laminar"].data,
+            }
+
+        # El resumen vale lo que la capa menos fresca de las que lo forman
+        deadline = summary_deadline(raw)
+        if deadline > time.monotonic():
+            _summary_cache[key] = (deadline, {k: v for k, v in out.items() if k not in ("lat", "lon")})
+        return out
+    except Exception as e:
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
 
+
+class Punto(BaseModel):
+    lat: float
+    lon: float
+
+
+BATCH_MAX_POINTS = 500
+BATCH_CONCURRENCY = 8  # peticiones a los servidores WMS en vuelo a la vez por lote
+# Puntos en curso a la vez. La espera por BATCH_CONCURRENCY cuenta dentro de
+# FETCH_BUDGET, así que se mantienen pocos: con dos, las capas del siguiente
+# punto ocupan los huecos que deja la más lenta del anterior.
+BATCH_POINTS = 2
+
+
+@app.post("/api/risk_batch")
+async def api_risk_batch(request: Request, puntos: List[Punto]):
+    if len(puntos) > BATCH_MAX_POINTS:
+        return ORJSONResponse(
+            status_code=400,
+            content={"error": f"máximo {BATCH_MAX_POINTS} puntos por lote"},
+        )
+    try:
+        points = asyncio.Semaphore(BATCH_POINTS)
+        upstream = asyncio.Semaphore(BATCH_CONCURRENCY)
+        client = request.app.state.http
+
+        async def fetch_one(p: Punto) -> Dict[str, Any]:
+            async with points:
+                return await fetch_all_risks(p.lat, p.lon, client, first_only=True, sem=upstream)
+
+        raws = await asyncio.gather(*(fetch_one(p) for p in puntos))
+
+        # Inundación y sísmico se clasifican de una vez para todos los puntos
+        inundacion: Dict[str, Dict[str, List[str]]] = {}
+        for grupo, (_, periodos) in FLOOD_LAYERS.items():
+            inundacion[grupo] = {
+                periodo: classify_gray_batch(np.fromiter(
+                    (gray_value(raw[grupo][periodo]) for raw in raws),
+                    dtype=np.float64, count=len(raws),
+                ))
+                for periodo in periodos
+            }
+        sismico = classify_pga_batch([pga_value(raw["sismico"]) for raw in raws])
+
+        out = []
+        for i, (p, raw) in enumerate(zip(puntos, raws)):
+            out.append({
+                "lat": p.lat,
+                "lon": p.lon,
+                "resumen": {
+                    "incendios": parse_incendios_summary(raw["incendios"]),
+                    **{
+                        grupo: {periodo: labels[i] for periodo, labels in por_periodo.items()}
+                        for grupo, por_periodo in inundacion.items()
+                    },
+                    "sismico": sismico[i],
+                    "desertificacion": {
+                        "potencial": parse_desertificacion_summary(raw["desertificacion_potencial"], "potencial"),
+                        "laminar": parse_desertificacion_summary(raw["desertificacion_laminar"], "laminar"),
+                    },
+                },
+            })
         return out
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return ORJSONResponse(status_code=500, content={"error": str(e)})